@@ -1,14 +1,87 @@
 import pandas as pd
 import re
-from datetime import datetime
 import os 
 
+# Ordinal suffix on a day number, e.g. the "th" in "19th"
+_ORDINAL_RE = re.compile(r'(\d+)(?:st|nd|rd|th)')
+
+# Write buffer for CSV output
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+def _read_csv(path, **kwargs):
+    """
+    Reads a CSV with the pyarrow engine, falling back to the default
+    engine if pyarrow is not installed or cannot handle the file.
+    """
+    try:
+        df = pd.read_csv(path, engine='pyarrow', **kwargs)
+    except (ImportError, KeyError, ValueError):
+        # pyarrow reports missing usecols as a KeyError; the default engine
+        # raises the usual ValueError for it
+        return pd.read_csv(path, **kwargs)
+
+    # pyarrow returns text that isn't valid UTF-8 as bytes instead of
+    # raising, so re-read with the default engine to surface the error
+    if any(
+        col.dtype == object and pd.api.types.infer_dtype(col) == 'bytes'
+        for _, col in df.items()
+    ):
+        return pd.read_csv(path, **kwargs)
+    return df
+
+def _build_mapping(core_df, name_col, part_col, avail_col):
+    """
+    Reduces cleaned responses to one row per person with their part and
+    total number of slots wanted.
+    """
+    wanted = core_df[avail_col].fillna('')
+    mapping_df = core_df[[name_col, part_col]].assign(
+        TotalWantedSlots=(wanted.str.count(',') + 1).where(wanted != '', 0)
+    )
+    return mapping_df.drop_duplicates(subset=[name_col])
+
+def _pick_least_assigned(candidates, counts, k):
+    """
+    Greedily picks the k candidates with the fewest assignments so far,
+    ties broken by response order, and returns them in that order.
+    """
+    if len(candidates) <= k:
+        return candidates
+
+    # sorted is stable, so equal counts keep response order
+    return sorted(candidates, key=counts.__getitem__)[:k]
+
+def _schedule(candidate_groups, n_people, k):
+    """
+    Runs the greedy assignment over lists of candidate name codes, in order,
+    and returns the codes picked for each list.
+
+    Each pick depends on the counts left by the previous one, so this part
+    is inherently sequential.
+    """
+    # A plain list scoreboard: for a choir-sized input, per-call NumPy
+    # overhead outweighs the arithmetic
+    counts = [0] * n_people
+    picks = []
+    for candidates in candidate_groups:
+        # Take the k least assigned (everyone if k or fewer are available)
+        picked = _pick_least_assigned(candidates, counts, k)
+
+        # Update counts (a repeated name only counts once, as with .loc)
+        for i in set(picked):
+            counts[i] += 1
+        picks.append(picked)
+    return picks
+
 def solve_choir_assignment(csv_file_path):
     """
     Solves the choir assignment problem based on availability and fairness.
 
     Constraints:
     1. Max 3 people per part (Soprano, Alto, Tenor, Bass) per slot.
+
+    Returns the assignment DataFrame and a per-person mapping of part and
+    wanted slots for generate_and_save_summary_stats.
     """
 
     NAME_COL = 'Name and Part'
@@ -17,112 +90,118 @@ def solve_choir_assignment(csv_file_path):
     CHOIR_PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
     OUTPUT_FILE = 'choir_assignment.csv'
     
+    # Only parse the columns we need
     try:
-        df = pd.read_csv(csv_file_path)
+        # dtype=str so a header-only export still gives string columns
+        core_df = _read_csv(
+            csv_file_path, usecols=[NAME_COL, PART_COL, AVAIL_COL], dtype=str
+        )
     except FileNotFoundError:
         print(f"Error: The file '{csv_file_path}' was not found.")
         return
+    except ValueError as e:
+        # usecols raises if a required column is missing; otherwise (or if
+        # the header itself can't be read) report the load error
+        try:
+            found = pd.read_csv(csv_file_path, nrows=0).columns.tolist()
+        except Exception:
+            found = None
+        if found is None or {NAME_COL, PART_COL, AVAIL_COL}.issubset(found):
+            print(f"An error occurred while loading the file: {e}")
+            return
+        print("Error: One of the required columns was not found.")
+        print(f"Needed: '{NAME_COL}', '{PART_COL}', '{AVAIL_COL}'")
+        print(f"Found: {found}")
+        return
     except Exception as e:
         print(f"An error occurred while loading the file: {e}")
         return
 
     # preprocess
     print("Processing availabilities...")
-    
-    # Select only the columns we need
-    try:
-        core_df = df[[NAME_COL, PART_COL, AVAIL_COL]].copy()
-    except KeyError:
-        print("Error: One of the required columns was not found.")
-        print(f"Needed: '{NAME_COL}', '{PART_COL}', '{AVAIL_COL}'")
-        print(f"Found: {df.columns.tolist()}")
-        return
 
     # Clean data
-    core_df[NAME_COL] = core_df[NAME_COL].str.strip()
-    core_df[PART_COL] = core_df[PART_COL].str.strip()
+    core_df = core_df.assign(**{
+        NAME_COL: core_df[NAME_COL].str.strip(),
+        PART_COL: core_df[PART_COL].str.strip(),
+    })
+    mapping_df = _build_mapping(core_df, NAME_COL, PART_COL, AVAIL_COL)
     core_df = core_df.dropna(subset=[AVAIL_COL])
-    core_df[AVAIL_COL] = core_df[AVAIL_COL].str.split(',')
+    # Strip around each comma while splitting, so slots need no second pass
+    core_df[AVAIL_COL] = core_df[AVAIL_COL].str.strip().str.split(r'\s*,\s*', regex=True)
     avail_df = core_df.explode(AVAIL_COL)
-    avail_df[AVAIL_COL] = avail_df[AVAIL_COL].str.strip()
     avail_df = avail_df.rename(columns={AVAIL_COL: 'Slot'})
-    avail_df = avail_df[avail_df['Slot'] != '']
+    avail_df = avail_df[avail_df['Slot'].astype(bool)]
+
+    # Names, parts and slots repeat heavily after the explode
+    for col in [NAME_COL, PART_COL, 'Slot']:
+        avail_df[col] = avail_df[col].astype('category')
     
 
     # Initialise
-    all_people = avail_df[NAME_COL].unique()
-    assignment_counts = pd.Series(0, index=all_people, dtype=int)
+    all_people = avail_df[NAME_COL].cat.categories.tolist()
     all_slots = avail_df['Slot'].unique()
     
-    # Helper function to parse custom date strings 
-    def parse_slot_to_datetime(slot_str):
-        # Assumes format like "Weds 19th Nov 11am"
-        # For 2025
-        try:
-            no_day = slot_str.split(' ', 1)[-1]
-            no_ordinal = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', no_day)
-            parts = no_ordinal.split(' ') # e.g., ["19", "Nov", "11am"]
-            if len(parts) != 3:
-                # Handle unexpected format
-                print(f"Warning: Could not parse date '{slot_str}'. Placing at end.")
-                return datetime.max
-    
-            date_str_with_year = f"{parts[0]} {parts[1]} 2025 {parts[2]}"
-            
-            return datetime.strptime(date_str_with_year, "%d %b %Y %I%p")
-        
-        except Exception as e:
-            print(f"Warning: Could not parse date '{slot_str}'. Placing at end. Error: {e}")
-            # Put any unparseable dates at the end of the sort
-            return datetime.max
-    
-    # Sort the unique slots using the helper function as the key
-    all_slots_sorted = sorted(all_slots, key=parse_slot_to_datetime)
-    
-    # Create the final DataFrame with Slots as rows (now sorted)
-    final_assignment_df = pd.DataFrame(
-        index=all_slots_sorted,
-        columns=CHOIR_PARTS
+    # Parse all slot strings in one vectorised pass
+    # Assumes format like "Weds 19th Nov 11am", for 2025
+    slot_strs = pd.Series(all_slots)
+    no_day = slot_strs.str.split(' ', n=1).str[-1]
+    no_ordinal = no_day.str.replace(_ORDINAL_RE, r'\1', regex=True)
+    slot_times = pd.to_datetime(
+        no_ordinal + ' 2025', format='%d %b %I%p %Y', errors='coerce'
     )
+    for slot_str in slot_strs[slot_times.isna()]:
+        print(f"Warning: Could not parse date '{slot_str}'. Placing at end.")
+
+    # Sort the unique slots chronologically, unparseable dates at the end
+    slot_times = slot_times.fillna(pd.Timestamp.max)
+    all_slots_sorted = [all_slots[i] for i in slot_times.argsort(kind='stable')]
     
-    final_assignment_df.index.name = 'Slot'
+    # Collect assignments per part, build the DataFrame once at the end
+    results = {part: {} for part in CHOIR_PARTS}
     
     # Contraints
 
-    # Loop through each slot in chronological order
-    for slot in all_slots_sorted:
-        for part in CHOIR_PARTS:
-            
-            # get all available candidates 
-            candidates_df = avail_df[
-                (avail_df['Slot'] == slot) & (avail_df[PART_COL] == part)
-            ]
-            
-            candidates_names = candidates_df[NAME_COL]
-            
-            # If no one is available, just continue
-            if len(candidates_names) == 0:
-                continue
-            
-            # If 3 or fewer are available, they all get the slot
-            if len(candidates_names) <= 3:
-                assigned_names = candidates_names.tolist()
-            
-            # If MORE than 3 are available
-            else:
-                # Get current assignment count
-                candidate_counts = assignment_counts.loc[candidates_names]
-                candidates_sorted_by_count = candidate_counts.sort_values(ascending=True)
-                
-                # Take the top 3 
-                assigned_names = candidates_sorted_by_count.head(3).index.tolist()
-
-            final_assignment_df.at[slot, part] = '\n'.join(assigned_names)
-            assignment_counts.loc[assigned_names] += 1
+    # Order slots chronologically and parts as listed, so sorting the
+    # (slot code, part code) keys gives assignment order
+    avail_df['Slot'] = avail_df['Slot'].cat.reorder_categories(
+        all_slots_sorted, ordered=True
+    )
+    avail_df[PART_COL] = avail_df[PART_COL].cat.set_categories(
+        CHOIR_PARTS, ordered=True
+    )
+
+    # Map each (slot code, part code) to its candidates' name codes, which
+    # index into all_people. Parts outside CHOIR_PARTS and missing names
+    # have code -1 and are dropped
+    codes = pd.DataFrame(
+        {col: avail_df[col].cat.codes for col in ['Slot', PART_COL, NAME_COL]}
+    )
+    codes = codes[(codes[PART_COL] >= 0) & (codes[NAME_COL] >= 0)]
+    name_codes = codes[NAME_COL].to_numpy()
+    cand_map = {
+        key: name_codes[idx].tolist()
+        for key, idx in codes.groupby(['Slot', PART_COL]).indices.items()
+    }
+
+    # Run the greedy assignment over each slot/part in chronological order
+    keys = sorted(cand_map)
+    picks = _schedule([cand_map[key] for key in keys], len(all_people), 3)
+
+    for (slot_code, part_code), assigned_idx in zip(keys, picks):
+        slot = all_slots_sorted[slot_code]
+        part = CHOIR_PARTS[part_code]
+        results[part][slot] = '\n'.join(all_people[i] for i in assigned_idx)
+
+    # Create the final DataFrame with Slots as rows (now sorted)
+    final_assignment_df = pd.DataFrame(results).reindex(all_slots_sorted).fillna("")
+    final_assignment_df.index.name = 'Slot'
 
     # display
-    final_assignment_df = final_assignment_df.fillna("")
-    final_assignment_df.to_csv(OUTPUT_FILE)
+    with open(
+        OUTPUT_FILE, 'w', buffering=_WRITE_BUFFER_SIZE, encoding='utf-8', newline=''
+    ) as f:
+        final_assignment_df.to_csv(f)
     
     print("\n--- Success! ---")
     print(f"Choir assignment complete. File saved as '{OUTPUT_FILE}'")
@@ -130,12 +209,15 @@ def solve_choir_assignment(csv_file_path):
     print("\nPreview of the Assignment DataFrame:")
     print(final_assignment_df.head())
     
-    return final_assignment_df
+    return final_assignment_df, mapping_df
 
-def generate_and_save_summary_stats():
+def generate_and_save_summary_stats(assignment_df=None, mapping_df=None):
     """
     Generates summary statistics from the final choir assignment,
     groups them by voice part, and saves to a new CSV.
+
+    Takes the assignment and name/part mapping returned by
+    solve_choir_assignment; either is loaded from disk if not given.
     """
     ASSIGNMENT_FILE = 'choir_assignment.csv'
     RAW_DATA_FILE = os.path.join(os.getcwd(), 'data', 'responses.csv')
@@ -146,69 +228,66 @@ def generate_and_save_summary_stats():
     AVAIL_COL = 'Please select dates and times you are available on:'
     
     # load
-    try:
-        assignment_df = pd.read_csv(ASSIGNMENT_FILE, index_col=0)
-    except FileNotFoundError:
-        print(f"Error: The file '{ASSIGNMENT_FILE}' was not found.")
-        print("Please run the 'solve_choir_assignment.py' script first.")
-        return
-    except Exception as e:
-        print(f"An error occurred loading '{ASSIGNMENT_FILE}': {e}")
-        return
+    if assignment_df is None:
+        try:
+            assignment_df = _read_csv(ASSIGNMENT_FILE, index_col=0)
+        except FileNotFoundError:
+            print(f"Error: The file '{ASSIGNMENT_FILE}' was not found.")
+            print("Please run the 'solve_choir_assignment.py' script first.")
+            return
+        except Exception as e:
+            print(f"An error occurred loading '{ASSIGNMENT_FILE}': {e}")
+            return
 
-    try:
-        raw_df = pd.read_csv(RAW_DATA_FILE)
-    except FileNotFoundError:
-        print(f"Error: The file '{RAW_DATA_FILE}' was not found.")
-        return
-    except Exception as e:
-        print(f"An error occurred loading '{RAW_DATA_FILE}': {e}")
-        return
+    if mapping_df is None:
+        try:
+            raw_df = _read_csv(RAW_DATA_FILE, dtype=str)
+        except FileNotFoundError:
+            print(f"Error: The file '{RAW_DATA_FILE}' was not found.")
+            return
+        except Exception as e:
+            print(f"An error occurred loading '{RAW_DATA_FILE}': {e}")
+            return
+
+        # name part mapping
+        # Check
+        if not {NAME_COL, PART_COL, AVAIL_COL}.issubset(raw_df.columns):
+            print(f"Error: Raw data file is missing required columns.")
+            print(f"Needed: '{NAME_COL}', '{PART_COL}', and '{AVAIL_COL}'")
+            return
+
+        mapping_df = raw_df[[NAME_COL, PART_COL, AVAIL_COL]].assign(**{
+            NAME_COL: raw_df[NAME_COL].str.strip(),
+            PART_COL: raw_df[PART_COL].str.strip(),
+        })
+        mapping_df = _build_mapping(mapping_df, NAME_COL, PART_COL, AVAIL_COL)
         
-    print("Successfully loaded input files.")
+        print("Successfully loaded input files.")
 
     # get assignment counts
-    stacked_series = assignment_df.stack()
-    non_empty_series = stacked_series[stacked_series != ""]
-    list_of_names_series = non_empty_series.str.split('\n')
-    exploded_names = list_of_names_series.explode()
-    name_counts_series = exploded_names.value_counts()
+    # one split over all non-empty cells joined together
+    cells = assignment_df.to_numpy().ravel()
+    cells = cells[pd.notna(cells) & (cells != "")]
+    all_names = pd.Series('\n'.join(cells).split('\n'))
+    name_counts_series = all_names[all_names != ""].value_counts()
     stats_df = name_counts_series.reset_index()
     stats_df.columns = ['Name', 'TotalAssignedSlots']
     
-    # name part mapping
-    # Check
-    if not {NAME_COL, PART_COL, AVAIL_COL}.issubset(raw_df.columns):
-        print(f"Error: Raw data file is missing required columns.")
-        print(f"Needed: '{NAME_COL}', '{PART_COL}', and '{AVAIL_COL}'")
-        return
-        
-    mapping_df = raw_df[[NAME_COL, PART_COL, AVAIL_COL]].copy()
-    mapping_df[NAME_COL] = mapping_df[NAME_COL].str.strip()
-    mapping_df[PART_COL] = mapping_df[PART_COL].str.strip()
-    
-    # Total wanted, one entry pp
-    mapping_df[AVAIL_COL] = mapping_df[AVAIL_COL].fillna('')
-    mapping_df['TotalWantedSlots'] = mapping_df[AVAIL_COL].apply(
-        lambda x: 0 if x == '' else len(x.split(','))
-    )
-    mapping_df = mapping_df.drop_duplicates(subset=[NAME_COL])
-    
-    # merge, sort , save
-    merged_df = pd.merge(
-        stats_df,
-        mapping_df,
-        left_on='Name',
-        right_on=NAME_COL,
-        how='left'
+    # map, sort , save
+    mapping_df = mapping_df.set_index(NAME_COL)
+    stats_df[PART_COL] = stats_df['Name'].map(mapping_df[PART_COL]).fillna('Unknown')
+    stats_df['TotalWantedSlots'] = (
+        stats_df['Name'].map(mapping_df['TotalWantedSlots']).fillna(0).astype(int)
     )
-    merged_df[PART_COL] = merged_df[PART_COL].fillna('Unknown')
-    final_df = merged_df[[PART_COL, 'Name', 'TotalAssignedSlots', 'TotalWantedSlots']]
+    final_df = stats_df[[PART_COL, 'Name', 'TotalAssignedSlots', 'TotalWantedSlots']]
     final_df = final_df.sort_values(
         by=[PART_COL, 'TotalAssignedSlots', 'Name'],
         ascending=[True, False, True]
     )
-    final_df.to_csv(OUTPUT_FILE, index=False)
+    with open(
+        OUTPUT_FILE, 'w', buffering=_WRITE_BUFFER_SIZE, encoding='utf-8', newline=''
+    ) as f:
+        final_df.to_csv(f, index=False)
     
     print("\n--- Success! ---")
     print(f"Summary statistics grouped by part saved as '{OUTPUT_FILE}'")
@@ -219,8 +298,9 @@ def generate_and_save_summary_stats():
 
 if __name__ == "__main__":
     # Use the file you uploaded
-    assignment_df = solve_choir_assignment("data/responses.csv")
+    result = solve_choir_assignment("data/responses.csv")
     
     # Generate stats *after* the assignment is complete
-    if assignment_df is not None:
-        generate_and_save_summary_stats()
\ No newline at end of file
+    if result is not None:
+        assignment_df, mapping_df = result
+        generate_and_save_summary_stats(assignment_df, mapping_df)
\ No newline at end of file